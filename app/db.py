@@ -1,8 +1,11 @@
 # app/db.py
+import io
 import sqlite3
-import json
+import orjson
+import numpy as np
 import threading
-import time
+import atexit
+import weakref
 from datetime import datetime
 from pathlib import Path
 from contextlib import contextmanager
@@ -15,61 +18,74 @@ logger = logging.getLogger(__name__)
 
 DB_PATH = Path(__file__).parent.parent / "robot.db"
 
-# Connection pool for better performance
-class ConnectionPool:
-    def __init__(self, max_connections=10):
-        self.max_connections = max_connections
-        self.connections = []
-        self.lock = threading.Lock()
-        self.created_connections = 0
-    
-    def get_connection(self):
-        with self.lock:
-            if self.connections:
-                return self.connections.pop()
-            elif self.created_connections < self.max_connections:
-                conn = self._create_connection()
-                self.created_connections += 1
-                return conn
-            else:
-                # Wait for a connection to be returned
-                while not self.connections:
-                    time.sleep(0.01)
-                return self.connections.pop()
-    
-    def return_connection(self, conn):
-        with self.lock:
-            if len(self.connections) < self.max_connections:
-                self.connections.append(conn)
-            else:
-                conn.close()
-                self.created_connections -= 1
-    
-    def _create_connection(self):
-        conn = sqlite3.connect(DB_PATH.as_posix(), check_same_thread=False)
-        conn.row_factory = sqlite3.Row
-        # Enable WAL mode for better concurrency
-        conn.execute("PRAGMA journal_mode=WAL")
-        # Optimize for performance
-        conn.execute("PRAGMA synchronous=NORMAL")
-        conn.execute("PRAGMA cache_size=10000")
-        conn.execute("PRAGMA temp_store=MEMORY")
-        return conn
-
-# Global connection pool
-_pool = ConnectionPool()
+class _Connection(sqlite3.Connection):
+    # plain sqlite3.Connection objects cannot be weakly referenced; a Python subclass can
+    pass
+
+def _create_connection():
+    conn = sqlite3.connect(DB_PATH.as_posix(), check_same_thread=False, cached_statements=256, factory=_Connection)
+    conn.row_factory = sqlite3.Row
+    # Enable WAL mode for better concurrency
+    conn.execute("PRAGMA journal_mode=WAL")
+    # Optimize for performance
+    conn.execute("PRAGMA synchronous=NORMAL")
+    # Serve hot pages from a 256MB memory map and keep a 64MB page cache
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA cache_size=-64000")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    # Checkpoint the WAL every 1000 pages and wait on locks instead of failing with SQLITE_BUSY
+    conn.execute("PRAGMA wal_autocheckpoint=1000")
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+# Readers: one connection per thread, reused across calls without any cross-thread locking.
+# Writer: a single shared connection behind a lock. WAL lets readers proceed while it
+# writes, and funnelling every write through one connection avoids SQLITE_BUSY retries.
+_tls = threading.local()
+# Open connections, so they can be closed at interpreter exit. Held weakly: when a
+# thread exits, threading.local drops its connection and it is closed on collection.
+_all_conns = weakref.WeakSet()
+_all_conns_lock = threading.Lock()
+
+def _close_all_connections():
+    with _all_conns_lock:
+        for conn in list(_all_conns):
+            conn.close()
+        _all_conns.clear()
+
+atexit.register(_close_all_connections)
+
+_writer_conn = None
+_writer_lock = threading.Lock()
 
 @contextmanager
 def get_conn():
-    conn = _pool.get_connection()
-    try:
-        yield conn
-    finally:
-        _pool.return_connection(conn)
+    conn = getattr(_tls, "conn", None)
+    if conn is None:
+        conn = _create_connection()
+        _tls.conn = conn
+        with _all_conns_lock:
+            _all_conns.add(conn)
+    yield conn
+
+@contextmanager
+def get_write_conn():
+    global _writer_conn
+    with _writer_lock:
+        if _writer_conn is None:
+            _writer_conn = _create_connection()
+            with _all_conns_lock:
+                _all_conns.add(_writer_conn)
+        try:
+            yield _writer_conn
+        except Exception:
+            # never leave a half-done transaction open on the shared connection
+            _writer_conn.rollback()
+            raise
 
 def init_db():
     try:
-        with get_conn() as conn:
+        with get_write_conn() as conn:
             cur = conn.cursor()
             cur.execute("""
             CREATE TABLE IF NOT EXISTS trajectory (
@@ -77,7 +93,7 @@ def init_db():
                 wall_width REAL NOT NULL,
                 wall_height REAL NOT NULL,
                 step REAL NOT NULL,
-                path TEXT NOT NULL,
+                path BLOB NOT NULL,
                 obstacles TEXT DEFAULT '[]',
                 path_length INTEGER DEFAULT 0,
                 coverage_percentage REAL DEFAULT 0.0,
@@ -87,39 +103,168 @@ def init_db():
             """)
             # index to accelerate lookups by created_at or wall size queries
             cur.execute("CREATE INDEX IF NOT EXISTS idx_created_at ON trajectory(created_at)")
-            cur.execute("CREATE INDEX IF NOT EXISTS idx_wall_dims ON trajectory(wall_width, wall_height)")
-            cur.execute("CREATE INDEX IF NOT EXISTS idx_coverage ON trajectory(coverage_percentage)")
-            cur.execute("CREATE INDEX IF NOT EXISTS idx_processing_time ON trajectory(processing_time_ms)")
+            # covering index for the wall-size filtered listing: seek on the dims, read rows
+            # already in created_at DESC order, never touch the table itself
+            cur.execute("""CREATE INDEX IF NOT EXISTS idx_list ON trajectory(
+                wall_width, wall_height, created_at DESC, coverage_percentage, step, path_length, processing_time_ms)""")
+            # covering index for search_trajectories_by_performance: range filter and
+            # ORDER BY processing_time_ms LIMIT straight off the index, no sort
+            cur.execute("""CREATE INDEX IF NOT EXISTS idx_performance ON trajectory(
+                processing_time_ms, wall_width, wall_height, step, path_length, coverage_percentage, created_at)""")
+            # idx_wall_dims is a prefix of idx_list, idx_processing_time a prefix of
+            # idx_performance, and idx_coverage is not used by any query
+            cur.execute("DROP INDEX IF EXISTS idx_wall_dims")
+            cur.execute("DROP INDEX IF EXISTS idx_processing_time")
+            cur.execute("DROP INDEX IF EXISTS idx_coverage")
+            # running aggregates behind get_trajectory_stats, maintained on every insert
+            cur.execute("CREATE TABLE IF NOT EXISTS stats (k TEXT PRIMARY KEY, v REAL NOT NULL)")
+            if cur.execute("SELECT COUNT(*) FROM stats").fetchone()[0] == 0:
+                _rebuild_stats(cur)
             conn.commit()
     except Exception as e:
         print(f"Database initialization error: {e}")
         # Continue without database for serverless environments
 
+_STAT_COLUMNS = ("wall_width", "wall_height", "path_length", "coverage_percentage", "processing_time_ms")
+_PERFORMANCE_CATEGORIES = ("fast", "medium", "slow")
+
+def _performance_category(processing_time_ms):
+    # same buckets as the CASE in _rebuild_stats; NULL falls through to 'slow'
+    if processing_time_ms is not None and processing_time_ms < 100:
+        return "fast"
+    if processing_time_ms is not None and processing_time_ms < 500:
+        return "medium"
+    return "slow"
+
+def _rebuild_stats(cur):
+    """Recompute the stats table from a full scan of trajectory (used for databases created before it existed)"""
+    cur.execute("""
+        SELECT
+            COUNT(*),
+            TOTAL(wall_width), TOTAL(wall_height), TOTAL(path_length),
+            TOTAL(coverage_percentage), TOTAL(processing_time_ms),
+            COUNT(processing_time_ms), MIN(processing_time_ms), MAX(processing_time_ms),
+            TOTAL(CASE WHEN processing_time_ms < 100 THEN 1 ELSE 0 END),
+            TOTAL(CASE WHEN processing_time_ms >= 100 AND processing_time_ms < 500 THEN 1 ELSE 0 END),
+            TOTAL(CASE WHEN processing_time_ms < 500 THEN 0 ELSE 1 END)
+        FROM trajectory
+    """)
+    count, *sums, timed, min_time, max_time, fast, medium, slow = cur.fetchone()
+    values = {"count": count, "count:processing_time_ms": timed,
+              "perf:fast": fast, "perf:medium": medium, "perf:slow": slow}
+    values.update((f"sum:{col}", total) for col, total in zip(_STAT_COLUMNS, sums))
+    if min_time is not None:
+        values["min:processing_time_ms"] = min_time
+        values["max:processing_time_ms"] = max_time
+    cur.execute("DELETE FROM stats")
+    cur.executemany("INSERT INTO stats (k, v) VALUES (?, ?)", values.items())
+
+def _update_stats(cur, rows):
+    """Fold newly inserted trajectory rows into the stats table (call inside the insert's transaction)"""
+    deltas = {"count": len(rows)}
+    times = []
+    for row in rows:
+        wall_width, wall_height, _, _, _, path_length, coverage_percentage, processing_time_ms, _ = row
+        for col, value in zip(_STAT_COLUMNS, (wall_width, wall_height, path_length, coverage_percentage, processing_time_ms)):
+            if value is not None:
+                deltas[f"sum:{col}"] = deltas.get(f"sum:{col}", 0) + value
+        if processing_time_ms is not None:
+            times.append(processing_time_ms)
+        key = f"perf:{_performance_category(processing_time_ms)}"
+        deltas[key] = deltas.get(key, 0) + 1
+    deltas["count:processing_time_ms"] = len(times)
+    
+    cur.executemany(
+        "INSERT INTO stats (k, v) VALUES (?, ?) ON CONFLICT(k) DO UPDATE SET v = v + excluded.v",
+        deltas.items()
+    )
+    if times:
+        cur.execute(
+            "INSERT INTO stats (k, v) VALUES ('min:processing_time_ms', ?) ON CONFLICT(k) DO UPDATE SET v = MIN(v, excluded.v)",
+            (min(times),)
+        )
+        cur.execute(
+            "INSERT INTO stats (k, v) VALUES ('max:processing_time_ms', ?) ON CONFLICT(k) DO UPDATE SET v = MAX(v, excluded.v)",
+            (max(times),)
+        )
+
+def encode_path(path):
+    """Pack a path of (x, y) points into float32 pairs for the BLOB column"""
+    return sqlite3.Binary(np.asarray(path, dtype=np.float32).tobytes())
+
+def decode_path(value):
+    """Return a stored path as an (N, 2) float32 array"""
+    if isinstance(value, str):
+        # rows written before the path column was switched to BLOB hold JSON text
+        return np.asarray(orjson.loads(value), dtype=np.float32).reshape(-1, 2)
+    return np.frombuffer(value, dtype=np.float32).reshape(-1, 2)
+
+_INSERT_TRAJECTORY = """INSERT INTO trajectory (wall_width, wall_height, step, path, obstacles, path_length, 
+                   coverage_percentage, processing_time_ms, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+def _trajectory_row(wall_width, wall_height, step, path, obstacles=None, processing_time_ms=None):
+    now = datetime.utcnow().isoformat()
+    
+    # Calculate path length and coverage percentage
+    path_length = len(path)
+    obstacles = obstacles or []
+    total_obstacle_area = sum(obs['width'] * obs['height'] for obs in obstacles)
+    coverage_percentage = round(((wall_width * wall_height - total_obstacle_area) / (wall_width * wall_height)) * 100, 2)
+    
+    return (wall_width, wall_height, step, encode_path(path), orjson.dumps(obstacles).decode(), 
+            path_length, coverage_percentage, processing_time_ms, now)
+
 def save_trajectory(wall_width, wall_height, step, path, obstacles=None, processing_time_ms=None):
+    """Insert one trajectory and return (id, coverage_percentage)"""
+    row = _trajectory_row(wall_width, wall_height, step, path, obstacles, processing_time_ms)
+    coverage_percentage = row[6]
     try:
-        with get_conn() as conn:
+        with get_write_conn() as conn:
             cur = conn.cursor()
-            now = datetime.utcnow().isoformat()
-            
-            # Calculate path length and coverage percentage
-            path_length = len(path)
-            obstacles = obstacles or []
-            total_obstacle_area = sum(obs['width'] * obs['height'] for obs in obstacles)
-            coverage_percentage = round(((wall_width * wall_height - total_obstacle_area) / (wall_width * wall_height)) * 100, 2)
-            
-            cur.execute(
-                """INSERT INTO trajectory (wall_width, wall_height, step, path, obstacles, path_length, 
-                   coverage_percentage, processing_time_ms, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                (wall_width, wall_height, step, json.dumps(path), json.dumps(obstacles), 
-                 path_length, coverage_percentage, processing_time_ms, now)
-            )
-            conn.commit()
+            cur.execute(_INSERT_TRAJECTORY, row)
             tid = cur.lastrowid
-            return tid
+            _update_stats(cur, [row])
+            conn.commit()
+            return tid, coverage_percentage
     except Exception as e:
         print(f"Database save error: {e}")
         # Return a mock ID for serverless environments
-        return 1
+        return 1, coverage_percentage
+
+def save_trajectories_bulk(trajectories):
+    """
+    Insert many trajectories in a single transaction (one commit, one WAL sync).
+    trajectories is a list of (wall_width, wall_height, step, path, obstacles, processing_time_ms) tuples.
+    Returns (id, coverage_percentage) for each trajectory in input order.
+    """
+    rows = [_trajectory_row(*t) for t in trajectories]
+    if not rows:
+        return []
+    coverages = [row[6] for row in rows]
+    try:
+        with get_write_conn() as conn:
+            with conn:
+                cur = conn.cursor()
+                cur.executemany(_INSERT_TRAJECTORY, rows)
+                # executemany leaves cursor.lastrowid untouched; the rows of one
+                # transaction get consecutive ids ending at last_insert_rowid()
+                last_id = cur.execute("SELECT last_insert_rowid()").fetchone()[0]
+                _update_stats(cur, rows)
+            return list(zip(range(last_id - len(rows) + 1, last_id + 1), coverages))
+    except Exception as e:
+        print(f"Database bulk save error: {e}")
+        # Return mock IDs for serverless environments
+        return [(1, coverage) for coverage in coverages]
+
+def _fetch_dicts(cur, batch_size=1000):
+    """Materialize the result of cur as dicts, looking up the column names only once"""
+    cols = [d[0] for d in cur.description]
+    rows = []
+    while True:
+        batch = cur.fetchmany(batch_size)
+        if not batch:
+            return rows
+        rows.extend(dict(zip(cols, r)) for r in batch)
 
 def get_trajectory(tid):
     with get_conn() as conn:
@@ -128,70 +273,112 @@ def get_trajectory(tid):
         row = cur.fetchone()
         if not row:
             return None
-        return dict(row)
+        traj = dict(row)
+        traj["path"] = decode_path(traj["path"])
+        return traj
+
+def get_trajectory_path_blob(tid):
+    """Return the stored path of a trajectory as packed float32 (x, y) bytes, or None if it does not exist"""
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT path FROM trajectory WHERE id = ?", (tid,))
+        row = cur.fetchone()
+        if not row:
+            return None
+        blob = row[0]
+        if isinstance(blob, str):
+            # legacy JSON text row
+            return bytes(encode_path(decode_path(blob)))
+        return blob
+
+def open_trajectory_path(tid):
+    """
+    Open the stored path of a trajectory for incremental reading.
+    Returns (size_in_bytes, reader) where reader has read(n) and close(), or None if it does not exist.
+    """
+    with get_conn() as conn:
+        cur = conn.cursor()
+        # length() of a BLOB comes from the record header, the value itself is not loaded
+        cur.execute("SELECT typeof(path), length(path) FROM trajectory WHERE id = ?", (tid,))
+        row = cur.fetchone()
+        if not row:
+            return None
+        kind, size = row
+        if kind == "blob" and hasattr(conn, "blobopen"):
+            # Python 3.11+: sqlite3.Blob reads pages on demand instead of materializing the value
+            return size, conn.blobopen("trajectory", "path", tid, readonly=True)
+    # older Pythons and legacy JSON text rows: load the whole path
+    blob = get_trajectory_path_blob(tid)
+    if blob is None:
+        return None
+    return len(blob), io.BytesIO(blob)
 
 def list_trajectories(limit=20, offset=0, wall_width=None, wall_height=None, min_coverage=None):
     with get_conn() as conn:
         cur = conn.cursor()
+        # plain tuples: _fetch_dicts zips them with the column names
+        cur.row_factory = None
         
-        # Build query with optional filters
-        query = "SELECT id, wall_width, wall_height, step, path_length, coverage_percentage, processing_time_ms, created_at FROM trajectory"
-        conditions = []
-        params = []
-        
-        if wall_width is not None:
-            conditions.append("wall_width = ?")
-            params.append(wall_width)
-        if wall_height is not None:
-            conditions.append("wall_height = ?")
-            params.append(wall_height)
-        if min_coverage is not None:
-            conditions.append("coverage_percentage >= ?")
-            params.append(min_coverage)
-        
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
-        
-        query += " ORDER BY created_at DESC LIMIT ? OFFSET ?"
-        params.extend([limit, offset])
-        
-        cur.execute(query, params)
-        rows = cur.fetchall()
-        return [dict(r) for r in rows]
+        # Constant SQL text with NULL-able filters so sqlite reuses the prepared statement.
+        # Filtering on both wall dims gets its own statement so it can seek idx_list.
+        params = {"wall_width": wall_width, "wall_height": wall_height, "min_coverage": min_coverage,
+                  "limit": limit, "offset": offset}
+        if wall_width is not None and wall_height is not None:
+            cur.execute(
+                """SELECT id, wall_width, wall_height, step, path_length, coverage_percentage, processing_time_ms, created_at
+                   FROM trajectory
+                   WHERE wall_width = :wall_width AND wall_height = :wall_height
+                     AND (:min_coverage IS NULL OR coverage_percentage >= :min_coverage)
+                   ORDER BY created_at DESC LIMIT :limit OFFSET :offset""",
+                params
+            )
+        else:
+            cur.execute(
+                """SELECT id, wall_width, wall_height, step, path_length, coverage_percentage, processing_time_ms, created_at
+                   FROM trajectory
+                   WHERE (:wall_width IS NULL OR wall_width = :wall_width)
+                     AND (:wall_height IS NULL OR wall_height = :wall_height)
+                     AND (:min_coverage IS NULL OR coverage_percentage >= :min_coverage)
+                   ORDER BY created_at DESC LIMIT :limit OFFSET :offset""",
+                params
+            )
+        return _fetch_dicts(cur)
 
 def get_trajectory_stats():
     """Get comprehensive statistics about stored trajectories"""
     with get_conn() as conn:
         cur = conn.cursor()
         
-        # Get basic stats
-        cur.execute("""
-            SELECT 
-                COUNT(*) as total_trajectories,
-                AVG(wall_width) as avg_wall_width,
-                AVG(wall_height) as avg_wall_height,
-                AVG(path_length) as avg_path_length,
-                AVG(coverage_percentage) as avg_coverage,
-                AVG(processing_time_ms) as avg_processing_time,
-                MIN(processing_time_ms) as min_processing_time,
-                MAX(processing_time_ms) as max_processing_time
-            FROM trajectory
-        """)
-        stats = dict(cur.fetchone())
+        # Read the running aggregates instead of scanning the trajectory table
+        cur.execute("SELECT k, v FROM stats")
+        values = {row[0]: row[1] for row in cur.fetchall()}
+        
+        count = int(values.get("count", 0))
+        timed = values.get("count:processing_time_ms", 0)
+        
+        def average(col, n=count):
+            return values.get(f"sum:{col}", 0) / n if n else None
+        
+        def as_int(key):
+            return int(values[key]) if key in values else None
+        
+        stats = {
+            "total_trajectories": count,
+            "avg_wall_width": average("wall_width"),
+            "avg_wall_height": average("wall_height"),
+            "avg_path_length": average("path_length"),
+            "avg_coverage": average("coverage_percentage"),
+            "avg_processing_time": average("processing_time_ms", timed),
+            "min_processing_time": as_int("min:processing_time_ms"),
+            "max_processing_time": as_int("max:processing_time_ms"),
+        }
         
         # Get performance distribution
-        cur.execute("""
-            SELECT 
-                CASE 
-                    WHEN processing_time_ms < 100 THEN 'fast'
-                    WHEN processing_time_ms < 500 THEN 'medium'
-                    ELSE 'slow'
-                END as performance_category,
-                COUNT(*) as count
-            FROM trajectory
-            GROUP BY performance_category
-        """)
-        performance_dist = {row[0]: row[1] for row in cur.fetchall()}
+        performance_dist = {}
+        for category in _PERFORMANCE_CATEGORIES:
+            n = int(values.get(f"perf:{category}", 0))
+            if n:
+                performance_dist[category] = n
         stats['performance_distribution'] = performance_dist
         
         return stats
@@ -200,24 +387,15 @@ def search_trajectories_by_performance(min_processing_time=None, max_processing_
     """Search trajectories by performance characteristics"""
     with get_conn() as conn:
         cur = conn.cursor()
+        # plain tuples: _fetch_dicts zips them with the column names
+        cur.row_factory = None
         
-        query = "SELECT id, wall_width, wall_height, step, path_length, coverage_percentage, processing_time_ms, created_at FROM trajectory"
-        conditions = []
-        params = []
-        
-        if min_processing_time is not None:
-            conditions.append("processing_time_ms >= ?")
-            params.append(min_processing_time)
-        if max_processing_time is not None:
-            conditions.append("processing_time_ms <= ?")
-            params.append(max_processing_time)
-        
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
-        
-        query += " ORDER BY processing_time_ms ASC LIMIT ?"
-        params.append(limit)
-        
-        cur.execute(query, params)
-        rows = cur.fetchall()
-        return [dict(r) for r in rows]
+        cur.execute(
+            """SELECT id, wall_width, wall_height, step, path_length, coverage_percentage, processing_time_ms, created_at
+               FROM trajectory
+               WHERE (:min_time IS NULL OR processing_time_ms >= :min_time)
+                 AND (:max_time IS NULL OR processing_time_ms <= :max_time)
+               ORDER BY processing_time_ms ASC LIMIT :limit""",
+            {"min_time": min_processing_time, "max_time": max_processing_time, "limit": limit}
+        )
+        return _fetch_dicts(cur)
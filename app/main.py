@@ -1,32 +1,69 @@
 # app/main.py
 from fastapi import FastAPI, Request, HTTPException, Query
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-import time, json, logging, hashlib
+import time, logging, logging.handlers, queue, atexit, struct
+import orjson
+from operator import itemgetter
+import xxhash
+import numpy as np
 from typing import Optional, Dict, Any
-from functools import lru_cache
-from .db import init_db, save_trajectory, get_trajectory, list_trajectories, get_trajectory_stats, search_trajectories_by_performance
+from cachetools import LRUCache, TTLCache, cached
+from .db import init_db, get_trajectory, open_trajectory_path, list_trajectories, get_trajectory_stats, search_trajectories_by_performance
 from .planner import generate_coverage_path
+from .writer import TrajectoryWriter
 from .models import GenerateRequest
 from pathlib import Path
 
-# Configure comprehensive logging
+# Configure comprehensive logging. Log calls only enqueue the record; a background
+# listener thread does the formatting and the file/console writes off the request path.
+log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+log_handlers = [
+    logging.FileHandler('robot_system.log'),
+    logging.StreamHandler()
+]
+for handler in log_handlers:
+    handler.setFormatter(log_formatter)
+log_queue = queue.SimpleQueue()
+log_listener = logging.handlers.QueueListener(log_queue, *log_handlers, respect_handler_level=True)
+log_listener.start()
+atexit.register(log_listener.stop)
+# force: db.py has already installed a default console handler on import
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('robot_system.log'),
-        logging.StreamHandler()
-    ]
+    format='%(message)s',  # the listener's handlers apply log_formatter
+    handlers=[logging.handlers.QueueHandler(log_queue)],
+    force=True
 )
 logger = logging.getLogger(__name__)
 
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered by orjson (numpy arrays and orjson.Fragment supported)"""
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+
 app = FastAPI(
     title="Autonomous Wall-Finishing Robot Control System",
     description="Intelligent path planning and coverage optimization for autonomous wall-finishing robots",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
+PATH_CHUNK_SIZE = 64 * 1024  # bytes per streamed chunk of a stored path
+
+async def iter_chunks(reader, chunk_size: int = PATH_CHUNK_SIZE):
+    """Yield reader's contents chunk_size bytes at a time, closing it when done or on disconnect"""
+    # async so Starlette consumes it on the event loop; each read is one
+    # chunk of pages from sqlite's mmap / page cache rather than a thread hop
+    try:
+        while True:
+            chunk = reader.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        reader.close()
+
 # Initialize database on startup (with error handling for serverless)
 try:
     init_db()
@@ -34,21 +71,46 @@ except Exception as e:
     logger.warning(f"Database initialization failed: {e}. Running in serverless mode.")
 
 # In-memory cache for frequently accessed data
-trajectory_cache: Dict[str, Any] = {}
-stats_cache: Dict[str, Any] = {}
 CACHE_TTL = 300  # 5 minutes
+CACHE_MAX_ENTRIES = 1024
+PATH_CACHE_MAX_BYTES = 256 * 1024 * 1024
+# charged per cached path on top of its payload: array header, key string and cache bookkeeping
+PATH_CACHE_ENTRY_OVERHEAD = 512
+# Bounded caches: least recently used entries are evicted once full, responses also expire after CACHE_TTL
+trajectory_cache: TTLCache = TTLCache(maxsize=CACHE_MAX_ENTRIES, ttl=CACHE_TTL)
+
+def path_cache_sizeof(path: np.ndarray) -> int:
+    """Bytes a cached path is charged against PATH_CACHE_MAX_BYTES, so even empty paths count"""
+    return path.nbytes + PATH_CACHE_ENTRY_OVERHEAD
+
+path_cache: LRUCache = LRUCache(maxsize=PATH_CACHE_MAX_BYTES, getsizeof=path_cache_sizeof)
+stats_cache: Dict[str, Any] = {}
+
+# Batches trajectory inserts from concurrent requests into single transactions
+trajectory_writer = TrajectoryWriter()
+
+_KEY_HEADER = struct.Struct("<dddI")
+_KEY_OBSTACLE = struct.Struct("<dddd")
 
 def get_cache_key(wall_width: float, wall_height: float, step: float, obstacles: list) -> str:
     """Generate a cache key for trajectory parameters"""
-    obstacles_str = json.dumps(sorted(obstacles, key=lambda x: (x['x'], x['y'], x['width'], x['height'])))
-    content = f"{wall_width}_{wall_height}_{step}_{obstacles_str}"
-    return hashlib.md5(content.encode()).hexdigest()
+    # Pack the parameters straight into a binary buffer instead of serializing to JSON
+    sorted_obs = sorted(obstacles, key=itemgetter('x', 'y', 'width', 'height'))
+    buf = bytearray(_KEY_HEADER.size + _KEY_OBSTACLE.size * len(sorted_obs))
+    _KEY_HEADER.pack_into(buf, 0, wall_width, wall_height, step, len(sorted_obs))
+    offset = _KEY_HEADER.size
+    for obs in sorted_obs:
+        _KEY_OBSTACLE.pack_into(buf, offset, obs['x'], obs['y'], obs['width'], obs['height'])
+        offset += _KEY_OBSTACLE.size
+    return xxhash.xxh3_128_hexdigest(buf)
 
-@lru_cache(maxsize=1000)
-def cached_generate_coverage_path(wall_width: float, wall_height: float, step: float, obstacles_str: str) -> tuple:
-    """Cached version of coverage path generation"""
-    obstacles = json.loads(obstacles_str)
-    return tuple(generate_coverage_path(wall_width, wall_height, obstacles, step))
+@cached(path_cache, key=get_cache_key)
+def cached_generate_coverage_path(wall_width: float, wall_height: float, step: float, obstacles: list) -> np.ndarray:
+    """Cached version of coverage path generation, keyed by the compact get_cache_key digest"""
+    path = generate_coverage_path(wall_width, wall_height, obstacles, step)
+    # the same array is handed to every caller, so guard it against mutation
+    path.flags.writeable = False
+    return path
 
 # serve static frontend
 app.mount("/static", StaticFiles(directory=Path(__file__).parent / "static"), name="static")
@@ -107,26 +169,23 @@ async def generate_trajectory(req: GenerateRequest):
     
     # Check cache first
     cache_key = get_cache_key(req.wall_width, req.wall_height, req.step, obstacles)
-    if cache_key in trajectory_cache:
-        cached_data = trajectory_cache[cache_key]
-        if time.time() - cached_data['timestamp'] < CACHE_TTL:
-            logger.info(f"Returning cached trajectory for key {cache_key[:8]}...")
-            return cached_data['response']
+    cached_response = trajectory_cache.get(cache_key)
+    if cached_response is not None:
+        logger.info(f"Returning cached trajectory for key {cache_key[:8]}...")
+        return cached_response
     
     # Generate path with timing
     start_time = time.time()
     try:
         # Use cached path generation if possible
-        obstacles_str = json.dumps(obstacles)
-        path_tuple = cached_generate_coverage_path(req.wall_width, req.wall_height, req.step, obstacles_str)
-        path = list(path_tuple)
+        path = cached_generate_coverage_path(req.wall_width, req.wall_height, req.step, obstacles)
         
         processing_time = int((time.time() - start_time) * 1000)  # Convert to milliseconds
         
         logger.info(f"Path generation completed in {processing_time}ms, generated {len(path)} points")
         
         # Save with enhanced metadata
-        tid = save_trajectory(
+        tid, coverage_percentage = await trajectory_writer.save(
             req.wall_width, req.wall_height, req.step, path, 
             obstacles=obstacles, processing_time_ms=processing_time
         )
@@ -135,14 +194,11 @@ async def generate_trajectory(req: GenerateRequest):
             "id": tid, 
             "path_length": len(path),
             "processing_time_ms": processing_time,
-            "coverage_percentage": round(((req.wall_width * req.wall_height - sum(obs['width'] * obs['height'] for obs in obstacles)) / (req.wall_width * req.wall_height)) * 100, 2)
+            "coverage_percentage": coverage_percentage
         }
         
         # Cache the response
-        trajectory_cache[cache_key] = {
-            'response': response_data,
-            'timestamp': time.time()
-        }
+        trajectory_cache[cache_key] = response_data
         
         return response_data
     except Exception as e:
@@ -157,11 +213,12 @@ async def get_traj(tid: int):
         logger.warning(f"Trajectory {tid} not found")
         raise HTTPException(status_code=404, detail="Trajectory not found")
     
-    # Return path as JSON string (tests expect a string) and obstacles as object
-    path_str = row["path"] if isinstance(row["path"], str) else json.dumps(row["path"])
-    obstacles = row["obstacles"] if isinstance(row["obstacles"], list) else json.loads(row["obstacles"])
+    # Return path as JSON string (tests expect a string) and obstacles as object.
+    # The stored obstacles column is already JSON, so splice it in as-is instead of parsing it.
+    path_str = orjson.dumps(row["path"], option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    obstacles = orjson.Fragment(row["obstacles"] or "[]")
     
-    return {
+    return ORJSONResponse({
         "id": row["id"],
         "wall_width": row["wall_width"],
         "wall_height": row["wall_height"],
@@ -172,7 +229,22 @@ async def get_traj(tid: int):
         "coverage_percentage": row["coverage_percentage"],
         "processing_time_ms": row["processing_time_ms"],
         "created_at": row["created_at"]
-    }
+    })
+
+@app.get("/trajectory/{tid}/path")
+async def get_traj_path(tid: int):
+    """Stream the stored path as raw little-endian float32 (x, y) pairs"""
+    logger.info(f"Streaming path of trajectory {tid}")
+    opened = open_trajectory_path(tid)
+    if opened is None:
+        logger.warning(f"Trajectory {tid} not found")
+        raise HTTPException(status_code=404, detail="Trajectory not found")
+    size, reader = opened
+    return StreamingResponse(
+        iter_chunks(reader),
+        media_type="application/octet-stream",
+        headers={"Content-Length": str(size)}
+    )
 
 @app.get("/trajectories")
 async def get_list(
@@ -183,13 +255,13 @@ async def get_list(
     min_coverage: Optional[float] = Query(None, ge=0, le=100, description="Minimum coverage percentage")
 ):
     logger.info(f"Listing trajectories: limit={limit}, offset={offset}, filters: width={wall_width}, height={wall_height}, min_coverage={min_coverage}")
-    return list_trajectories(limit=limit, offset=offset, wall_width=wall_width, wall_height=wall_height, min_coverage=min_coverage)
+    return ORJSONResponse(list_trajectories(limit=limit, offset=offset, wall_width=wall_width, wall_height=wall_height, min_coverage=min_coverage))
 
 @app.get("/trajectories/stats")
 async def get_trajectory_statistics():
     """Get comprehensive statistics about stored trajectories"""
     logger.info("Retrieving trajectory statistics")
-    return get_trajectory_stats()
+    return ORJSONResponse(get_trajectory_stats())
 
 @app.get("/trajectories/performance")
 async def get_trajectories_by_performance(
@@ -199,7 +271,7 @@ async def get_trajectories_by_performance(
 ):
     """Search trajectories by performance characteristics"""
     logger.info(f"Searching trajectories by performance: min_time={min_processing_time}, max_time={max_processing_time}")
-    return search_trajectories_by_performance(min_processing_time, max_processing_time, limit)
+    return ORJSONResponse(search_trajectories_by_performance(min_processing_time, max_processing_time, limit))
 
 # Simple homepage
 @app.get("/")
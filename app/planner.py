@@ -1,5 +1,12 @@
 # app/planner.py
-from typing import List, Dict, Tuple
+import math
+from typing import List, Dict
+
+import numpy as np
+
+# tolerance when mapping obstacle edges to cell indices, so an edge that lies on a
+# cell boundary (up to float noise) does not block the neighbouring cell
+_EDGE_EPS = 1e-9
 
 def rects_overlap(px, py, cell_w, cell_h, obs):
     # obs: dict with x, y (bottom-left), width, height (meters)
@@ -17,11 +24,18 @@ def point_in_any_obstacle(x, y, obstacles):
             return True
     return False
 
-def generate_coverage_path(wall_w: float, wall_h: float, obstacles: List[Dict], step: float = 0.1) -> List[Tuple[float, float]]:
+def _cell_span(lo, hi, cell, n):
+    # half-open index range [i0, i1) of the cells [i*cell, (i+1)*cell) that overlap (lo, hi);
+    # empty (i1 == i0) when the obstacle lies entirely outside the wall
+    i0 = max(0, math.floor(lo / cell + _EDGE_EPS))
+    i1 = max(i0, min(n, math.ceil(hi / cell - _EDGE_EPS)))
+    return i0, i1
+
+def generate_coverage_path(wall_w: float, wall_h: float, obstacles: List[Dict], step: float = 0.1) -> np.ndarray:
     """
     Generate a zigzag path covering the wall area with grid step size 'step' (meters).
     Obstacles is a list of dicts: {x, y, width, height} where (x,y) is bottom-left corner.
-    Returns a list of (x_center, y_center) points.
+    Returns an (N, 2) float32 array of (x_center, y_center) points.
     """
     # number of steps along x and y
     nx = max(1, int(round(wall_w / step)))
@@ -29,23 +43,31 @@ def generate_coverage_path(wall_w: float, wall_h: float, obstacles: List[Dict],
     cell_w = wall_w / nx
     cell_h = wall_h / ny
 
-    path = []
-    for row in range(ny):
-        y = (row + 0.5) * cell_h  # center of the cell
-        # determine x order: left->right or right->left
-        if row % 2 == 0:
-            x_indices = range(nx)
-        else:
-            x_indices = range(nx - 1, -1, -1)
-
-        for i in x_indices:
-            x = (i + 0.5) * cell_w
-            # skip if overlaps obstacle (we check rectangle overlap between cell and obstacle)
-            blocked = False
-            for obs in obstacles:
-                if rects_overlap(x - cell_w/2, y - cell_h/2, cell_w, cell_h, obs):
-                    blocked = True
-                    break
-            if not blocked:
-                path.append((round(x, 4), round(y, 4)))
+    # cell centers, rounded once per axis; zigzag: odd rows run right->left
+    xs = np.round((np.arange(nx) + 0.5) * cell_w, 4)
+    ys = np.round((np.arange(ny) + 0.5) * cell_h, 4)
+    grid_x = np.tile(xs, (ny, 1))
+    grid_x[1::2] = grid_x[1::2, ::-1]
+    grid_y = np.repeat(ys, nx)
+
+    # float32 is plenty for 4-decimal meter coordinates and halves memory and storage
+    if not obstacles:
+        # common case: every cell is free, so skip the mask and emit the grid directly
+        path = np.empty((nx * ny, 2), dtype=np.float32)
+        path[:, 0] = grid_x.ravel()
+        path[:, 1] = grid_y
+        return path
+
+    # mark the block of cells each obstacle covers: one slice fill per obstacle
+    blocked = np.zeros((ny, nx), dtype=bool)
+    for obs in obstacles:
+        i0, i1 = _cell_span(obs['x'], obs['x'] + obs['width'], cell_w, nx)
+        j0, j1 = _cell_span(obs['y'], obs['y'] + obs['height'], cell_h, ny)
+        blocked[j0:j1, i0:i1] = True
+    blocked[1::2] = blocked[1::2, ::-1]
+
+    free = np.flatnonzero(~blocked.ravel())
+    path = np.empty((free.size, 2), dtype=np.float32)
+    path[:, 0] = grid_x.ravel()[free]
+    path[:, 1] = grid_y[free]
     return path
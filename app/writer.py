@@ -0,0 +1,75 @@
+# app/writer.py
+import asyncio
+import logging
+from .db import save_trajectories_bulk
+
+logger = logging.getLogger(__name__)
+
+WRITE_BATCH_SIZE = 64
+WRITE_BATCH_WINDOW = 0.05  # seconds
+
+class TrajectoryWriter:
+    """
+    Batches trajectory saves from concurrent requests so each flush is a single
+    INSERT transaction. A batch is written once it holds WRITE_BATCH_SIZE rows or
+    WRITE_BATCH_WINDOW seconds after its first row arrived, whichever comes first.
+    """
+    def __init__(self, batch_size=WRITE_BATCH_SIZE, window=WRITE_BATCH_WINDOW):
+        self.batch_size = batch_size
+        self.window = window
+        self._loop = None
+        self._queue = None
+        self._batch_full = None
+        self._task = None
+    
+    def _ensure_running(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._task is not None and not self._task.done():
+            return
+        # asyncio primitives belong to one event loop, so start fresh whenever it changes
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._batch_full = asyncio.Event()
+        self._task = loop.create_task(self._run())
+    
+    async def save(self, wall_width, wall_height, step, path, obstacles=None, processing_time_ms=None):
+        """Queue a trajectory for the next batch and wait for its (id, coverage_percentage)"""
+        self._ensure_running()
+        future = self._loop.create_future()
+        self._queue.put_nowait(((wall_width, wall_height, step, path, obstacles, processing_time_ms), future))
+        # the writer holds the batch's first row outside the queue
+        if self._queue.qsize() >= self.batch_size - 1:
+            self._batch_full.set()
+        return await future
+    
+    async def _run(self):
+        queue = self._queue
+        batch_full = self._batch_full
+        while True:
+            batch = [await queue.get()]
+            # a backlog that already fills the batch is written at once; otherwise wait
+            # for save() to signal a full batch or for the window to run out
+            if queue.qsize() < self.batch_size - 1:
+                try:
+                    await asyncio.wait_for(batch_full.wait(), self.window)
+                except asyncio.TimeoutError:
+                    pass
+            batch_full.clear()
+            while len(batch) < self.batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+            await self._flush(batch)
+    
+    async def _flush(self, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(None, save_trajectories_bulk, [item for item, _ in batch])
+        except Exception as e:
+            logger.error(f"Trajectory batch write failed: {str(e)}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        logger.info(f"Wrote batch of {len(batch)} trajectories")
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -1,7 +1,11 @@
 # tests/test_api.py
 from fastapi.testclient import TestClient
 from app.main import app
+import asyncio
 import json
+import httpx
+import numpy as np
+import pytest
 
 client = TestClient(app)
 
@@ -24,3 +28,96 @@ def test_generate_and_get_trajectory():
     assert float(tdata["wall_width"]) == 2.0
     path = json.loads(tdata["path"])
     assert isinstance(path, list)
+
+def test_generate_trajectory_avoids_obstacles():
+    obstacle = {"x": 0.4, "y": 0.4, "width": 0.4, "height": 0.2}
+    payload = {
+        "wall_width": 2.0,
+        "wall_height": 1.0,
+        "step": 0.2,
+        "obstacles": [obstacle]
+    }
+    r = client.post("/generate_trajectory", json=payload)
+    assert r.status_code == 200
+    body = r.json()
+    # 10x5 grid minus the 2x1 cells covered by the obstacle
+    assert body["path_length"] == 48
+
+    tdata = client.get(f"/trajectory/{body['id']}").json()
+    path = json.loads(tdata["path"])
+    for x, y in path:
+        assert not (obstacle["x"] < x < obstacle["x"] + obstacle["width"]
+                    and obstacle["y"] < y < obstacle["y"] + obstacle["height"])
+    # zigzag: first row left->right, second row right->left
+    assert path[0][0] < path[1][0]
+    assert path[9] == [1.9, 0.1] and path[10] == [1.9, 0.3]
+    assert path[10][0] > path[11][0]
+
+def test_concurrent_generate_requests_get_distinct_ids():
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            payloads = [
+                {"wall_width": 1.0 + i / 10, "wall_height": 1.0, "step": 0.1, "obstacles": []}
+                for i in range(8)
+            ]
+            return await asyncio.gather(*(ac.post("/generate_trajectory", json=p) for p in payloads))
+
+    responses = asyncio.run(run())
+    assert all(r.status_code == 200 for r in responses)
+    ids = [r.json()["id"] for r in responses]
+    assert len(set(ids)) == len(ids)
+    for r in responses:
+        body = r.json()
+        tdata = client.get(f"/trajectory/{body['id']}").json()
+        assert tdata["path_length"] == body["path_length"]
+
+def test_stats_update_on_each_new_trajectory():
+    before = client.get("/trajectories/stats").json()
+    payload = {"wall_width": 3.3, "wall_height": 1.2, "step": 0.3, "obstacles": []}
+    r = client.post("/generate_trajectory", json=payload)
+    assert r.status_code == 200
+
+    body = r.json()
+
+    after = client.get("/trajectories/stats").json()
+    n = before["total_trajectories"]
+    assert after["total_trajectories"] == n + 1
+    assert sum(after["performance_distribution"].values()) == n + 1
+
+    # each average moves by exactly the new row's value
+    def expected_avg(key, value):
+        return ((before[key] or 0) * n + value) / (n + 1)
+
+    assert after["avg_wall_width"] == pytest.approx(expected_avg("avg_wall_width", 3.3))
+    assert after["avg_wall_height"] == pytest.approx(expected_avg("avg_wall_height", 1.2))
+    assert after["avg_path_length"] == pytest.approx(expected_avg("avg_path_length", body["path_length"]))
+    assert after["avg_coverage"] == pytest.approx(expected_avg("avg_coverage", 100.0))
+    assert after["min_processing_time"] <= body["processing_time_ms"] <= after["max_processing_time"]
+
+def test_stream_trajectory_path_matches_json_path():
+    payload = {"wall_width": 1.5, "wall_height": 0.8, "step": 0.1, "obstacles": []}
+    tid = client.post("/generate_trajectory", json=payload).json()["id"]
+
+    r = client.get(f"/trajectory/{tid}/path")
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/octet-stream"
+    streamed = np.frombuffer(r.content, dtype="<f4").reshape(-1, 2)
+
+    path = json.loads(client.get(f"/trajectory/{tid}").json()["path"])
+    assert streamed.shape == (len(path), 2)
+    assert np.allclose(streamed, path)
+
+    assert client.get("/trajectory/999999999/path").status_code == 404
+
+def test_stream_long_path_spans_many_chunks():
+    from app.planner import generate_coverage_path
+    payload = {"wall_width": 4.0, "wall_height": 3.0, "step": 0.01, "obstacles": []}
+    tid = client.post("/generate_trajectory", json=payload).json()["id"]
+
+    r = client.get(f"/trajectory/{tid}/path")
+    assert r.status_code == 200
+    # 120000 points * 8 bytes: about fifteen 64KB chunks
+    assert int(r.headers["content-length"]) == len(r.content) == 120000 * 8
+    expected = generate_coverage_path(4.0, 3.0, [], 0.01)
+    assert np.array_equal(np.frombuffer(r.content, dtype="<f4").reshape(-1, 2), expected)
@@ -0,0 +1,27 @@
+# tests/test_cache.py
+import numpy as np
+from cachetools import LRUCache
+from app import main
+from app.main import PATH_CACHE_ENTRY_OVERHEAD, path_cache_sizeof
+
+def test_path_cache_charges_empty_paths():
+    blocked = main.generate_coverage_path(1.0, 1.0, [{"x": 0, "y": 0, "width": 1, "height": 1}], 1.0)
+    assert blocked.shape == (0, 2)
+    assert path_cache_sizeof(blocked) == PATH_CACHE_ENTRY_OVERHEAD
+
+def test_path_cache_evicts_once_full():
+    # same policy as main.path_cache, scaled down to room for ten empty paths
+    cache = LRUCache(maxsize=10 * PATH_CACHE_ENTRY_OVERHEAD, getsizeof=path_cache_sizeof)
+    for i in range(50):
+        cache[f"key{i}"] = np.empty((0, 2), dtype=np.float32)
+    assert len(cache) == 10
+    assert cache.currsize <= cache.maxsize
+    assert "key0" not in cache and "key49" in cache
+
+def test_fully_blocked_paths_count_toward_the_real_cache():
+    main.path_cache.clear()
+    for i in range(3):
+        width = 1.0 + i * 1e-6
+        main.cached_generate_coverage_path(width, 1.0, 1.0, [{"x": 0, "y": 0, "width": width, "height": 1.0}])
+    assert len(main.path_cache) == 3
+    assert main.path_cache.currsize == 3 * PATH_CACHE_ENTRY_OVERHEAD
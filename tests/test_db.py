@@ -0,0 +1,60 @@
+# tests/test_db.py
+import pytest
+from app import db
+
+def legacy_stats():
+    """The full-scan queries get_trajectory_stats ran before the stats table existed"""
+    with db.get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT
+                COUNT(*) as total_trajectories,
+                AVG(wall_width) as avg_wall_width,
+                AVG(wall_height) as avg_wall_height,
+                AVG(path_length) as avg_path_length,
+                AVG(coverage_percentage) as avg_coverage,
+                AVG(processing_time_ms) as avg_processing_time,
+                MIN(processing_time_ms) as min_processing_time,
+                MAX(processing_time_ms) as max_processing_time
+            FROM trajectory
+        """)
+        stats = dict(cur.fetchone())
+        cur.execute("""
+            SELECT
+                CASE
+                    WHEN processing_time_ms < 100 THEN 'fast'
+                    WHEN processing_time_ms < 500 THEN 'medium'
+                    ELSE 'slow'
+                END as performance_category,
+                COUNT(*) as count
+            FROM trajectory
+            GROUP BY performance_category
+        """)
+        stats['performance_distribution'] = {row[0]: row[1] for row in cur.fetchall()}
+        return stats
+
+def assert_stats_equal(actual, expected):
+    assert actual.keys() == expected.keys()
+    for key, value in expected.items():
+        if isinstance(value, float):
+            assert actual[key] == pytest.approx(value)
+        else:
+            assert actual[key] == value
+
+def test_rebuilt_stats_match_full_table_queries():
+    db.init_db()
+    # NULL time and both sides of the 100ms / 500ms bucket edges
+    for processing_time_ms in (None, 99, 100, 499, 500, 1200):
+        db.save_trajectory(2.5, 1.5, 0.5, [[0.25, 0.25]] * 3,
+                           obstacles=[{"x": 0, "y": 0, "width": 0.5, "height": 0.5}],
+                           processing_time_ms=processing_time_ms)
+    assert_stats_equal(db.get_trajectory_stats(), legacy_stats())
+
+    # upgrade path: a database without the stats table gets it seeded by init_db
+    with db.get_write_conn() as conn:
+        conn.execute("DROP TABLE stats")
+        conn.commit()
+    db.init_db()
+    rebuilt = db.get_trajectory_stats()
+    assert_stats_equal(rebuilt, legacy_stats())
+    assert {"fast", "medium", "slow"} <= rebuilt["performance_distribution"].keys()
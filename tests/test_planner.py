@@ -0,0 +1,19 @@
+# tests/test_planner.py
+from app.planner import generate_coverage_path
+
+def test_obstacles_outside_wall_block_nothing():
+    obstacles = [
+        {"x": -1.0, "y": 0.0, "width": 0.5, "height": 1.0},  # left of the wall
+        {"x": 0.0, "y": -2.0, "width": 1.0, "height": 1.0},  # below the wall
+        {"x": 1.5, "y": 0.0, "width": 0.5, "height": 1.0},   # right of the wall
+        {"x": 0.0, "y": 1.0, "width": 1.0, "height": 0.5},   # above, touching the top edge
+    ]
+    path = generate_coverage_path(1, 1, obstacles, 0.1)
+    assert path.shape == (100, 2)
+    assert (path == generate_coverage_path(1, 1, [], 0.1)).all()
+
+def test_obstacle_partly_outside_wall_blocks_only_overlap():
+    # covers x in [-0.5, 0.2): only the first two columns of a 10x10 grid
+    path = generate_coverage_path(1, 1, [{"x": -0.5, "y": 0.0, "width": 0.7, "height": 1.0}], 0.1)
+    assert path.shape == (80, 2)
+    assert path[:, 0].min() > 0.2
@@ -0,0 +1,23 @@
+# tests/test_writer.py
+import asyncio
+from app import writer
+from app.writer import TrajectoryWriter
+
+def test_queued_backlog_flushes_full_batches_without_waiting(monkeypatch):
+    batches = []
+
+    def fake_bulk(rows):
+        batches.append(len(rows))
+        return [(i, 100.0) for i in range(len(rows))]
+
+    monkeypatch.setattr(writer, "save_trajectories_bulk", fake_bulk)
+    # a window far longer than the test may take: only full batches can finish in time
+    w = TrajectoryWriter(batch_size=8, window=30)
+
+    async def run():
+        saves = [w.save(1.0, 1.0, 0.1, [[0.05, 0.05]]) for _ in range(24)]
+        return await asyncio.wait_for(asyncio.gather(*saves), timeout=5)
+
+    results = asyncio.run(run())
+    assert len(results) == 24
+    assert batches == [8, 8, 8]